@@ -1,24 +1,171 @@
+from array import array
 from collections import UserDict
-from datetime import datetime, timedelta
+from datetime import date
+from functools import lru_cache
+import mmap
+import os
 import pickle
+import sys
 
 # AddressBookRepository for persistence
 class AddressBookRepository:
+    # Written before every snapshot; files without it are pickled object graphs
+    # saved by the original version and are read by _load_legacy
+    MAGIC = b"ABOOK\x01"
+
     def __init__(self, filename="addressbook.pkl"):
         self.filename = filename
+        # Set when the snapshot predates MAGIC, so it gets rewritten on save
+        self.legacy_snapshot = False
 
+    # Protocol 5 hands large binary fields (PickleBuffer) to buffer_callback instead of
+    # copying them into the stream; they are written after it as length-prefixed blocks
     def save(self, book):
-        with open(self.filename, "wb") as f:
-            pickle.dump(book, f)
-
+        buffers = []
+        data = pickle.dumps(book.to_columns(), protocol=pickle.HIGHEST_PROTOCOL, buffer_callback=buffers.append)
+        # Write to a temporary file and rename it over the snapshot, so a crash
+        # mid-write leaves the previous snapshot intact
+        tmp = self.filename + ".tmp"
+        with open(tmp, "wb", buffering=1 << 20) as f:
+            f.write(self.MAGIC)
+            f.write(len(data).to_bytes(8, "little"))
+            f.write(data)
+            for buffer in buffers:
+                raw = buffer.raw()
+                f.write(raw.nbytes.to_bytes(8, "little"))
+                f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.filename)
+
+    # Returns a book that only unpickles the snapshot when its contents are first used
     def load(self):
+        return LazyAddressBook(self._snapshot_reader())
+
+    # Maps the snapshot now and returns a function that unpickles it from the mapping.
+    # The file layout is checked here so a damaged snapshot is reported at startup
+    def _snapshot_reader(self):
         try:
             with open(self.filename, "rb") as f:
-                return pickle.load(f)
+                snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            # Missing or empty file
+            return AddressBook
+        try:
+            if snapshot[:len(self.MAGIC)] != self.MAGIC:
+                # Snapshots from the original version are decoded right away
+                self.legacy_snapshot = True
+                book = _load_legacy(snapshot)
+                return lambda: book
+            stream, buffers = self._split(memoryview(snapshot)[len(self.MAGIC):])
+        except Exception as e:
+            raise ValueError(f"Cannot read address book {self.filename}: {e}") from e
+
+        def read():
+            try:
+                return AddressBook.from_columns(*pickle.loads(stream, buffers=buffers))
+            except Exception as e:
+                raise ValueError(f"Cannot read address book {self.filename}: {e}") from e
+
+        return read
+
+    # Splits a saved file into the pickle stream and its out-of-band buffers
+    @staticmethod
+    def _split(data):
+        size = int.from_bytes(data[:8], "little")
+        offset = 8 + size
+        buffers = []
+        while offset < len(data):
+            length = int.from_bytes(data[offset:offset + 8], "little")
+            buffers.append(data[offset + 8:offset + 8 + length])
+            offset += 8 + length
+        if offset != len(data):
+            raise ValueError("truncated snapshot")
+        return data[8:8 + size], buffers
+
+# Stand-in for the classes pickled by the original version, which saved the whole
+# object graph; pickle restores their attributes straight into the instance dict
+class _LegacyObject:
+    pass
+
+class _LegacyUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if module in ("__main__", "main") and name in ("AddressBook", "Record", "Name", "Phone", "Birthday"):
+            return _LegacyObject
+        return super().find_class(module, name)
+
+# Reads a snapshot saved before MAGIC was added
+def _load_legacy(file):
+    legacy_book = _LegacyUnpickler(file).load()
+    book = AddressBook()
+    for legacy in legacy_book.data.values():
+        birthday = legacy.birthday.date.toordinal() if legacy.birthday else None
+        record = Record.__new__(Record)
+        record.__setstate__((legacy.name.value, [phone.value for phone in legacy.phones], birthday))
+        book.add_record(record)
+    return book
+
+# Repository that appends each edit to a journal instead of rewriting the snapshot
+class JournalRepository(AddressBookRepository):
+    def __init__(self, filename="addressbook.pkl", journal_filename="addressbook.journal", compact_size=1 << 20):
+        super().__init__(filename)
+        self.journal_filename = journal_filename
+        self.compact_size = compact_size
+        self.journal = None
+
+    # Reads the journal now and replays it on top of the snapshot when the book is first used
+    def load(self):
+        read_snapshot = self._snapshot_reader()
+        entries = []
+        try:
+            with open(self.journal_filename, "rb") as f:
+                end = 0
+                while True:
+                    header = f.read(4)
+                    size = int.from_bytes(header, "little")
+                    payload = f.read(size)
+                    if len(header) < 4 or len(payload) < size:
+                        break
+                    entries.append(payload)
+                    end = f.tell()
+            # Drop a partially written entry left by an interrupted session
+            if os.path.getsize(self.journal_filename) != end:
+                os.truncate(self.journal_filename, end)
         except FileNotFoundError:
-            return AddressBook()
+            pass
+        self.journal = open(self.journal_filename, "ab", buffering=1 << 16)
+
+        def replay():
+            book = read_snapshot()
+            for payload in entries:
+                command, args = pickle.loads(payload)
+                JOURNALED_COMMANDS[command](args, book)
+            return book
+
+        return LazyAddressBook(replay)
+
+    def append(self, command, args):
+        payload = pickle.dumps((command, args), protocol=pickle.HIGHEST_PROTOCOL)
+        self.journal.write(len(payload).to_bytes(4, "little") + payload)
+
+    # Rewrites the snapshot and empties the journal
+    def compact(self, book):
+        super().save(book)
+        if self.journal:
+            self.journal.close()
+        self.journal = open(self.journal_filename, "wb", buffering=1 << 16)
+
+    # Edits are already journaled, so only compact once the journal grows large.
+    # A book that was not loaded through this repository has nothing journaled,
+    # and a legacy snapshot is rewritten in the current format
+    def save(self, book):
+        if self.journal is None or self.legacy_snapshot or self.journal.tell() > self.compact_size:
+            self.compact(book)
+        self.journal.close()
 
 class Field:
+    __slots__ = ("value",)
+
     def __init__(self, value):
         self.value = value
 
@@ -26,57 +173,136 @@ class Field:
         return str(self.value)
 
 class Name(Field):
-		pass
+    __slots__ = ()
 
 class Birthday(Field):
+    __slots__ = ("date",)
+
     def __init__(self, value):
+        # Parse DD.MM.YYYY by hand, strptime is much slower for a fixed format
+        day, month, year = value[:2], value[3:5], value[6:]
         try:
-            self.date = datetime.strptime(value, "%d.%m.%Y")
+            if len(value) != 10 or value[2] != "." or value[5] != "." or not (day + month + year).isdigit():
+                raise ValueError
+            self.date = date(int(year), int(month), int(day))
             super().__init__(value)
         except ValueError:
             raise ValueError("Invalid date format. Use DD.MM.YYYY")
 
 class Phone(Field):
+    __slots__ = ()
+
     def __init__(self, value):
-        if not value.isdigit() or len(value) != 10:
+        # Length first and isascii() are O(1) and reject most bad input before isdigit()
+        if len(value) != 10 or not value.isascii() or not value.isdigit():
             raise ValueError("Phone number must be exactly 10 digits and contain only numbers.")
-        super().__init__(value)
+        super().__init__(sys.intern(value))
+
+# Build fields from already validated values, bypassing __init__
+def _phone_from_trusted(value):
+    phone = Phone.__new__(Phone)
+    phone.value = sys.intern(value)
+    return phone
+
+def _birthday_from_trusted(ordinal):
+    birthday = Birthday.__new__(Birthday)
+    birthday.date = date.fromordinal(ordinal)
+    # strftime("%Y") does not zero-pad years below 1000 on every platform
+    d = birthday.date
+    birthday.value = f"{d.day:02d}.{d.month:02d}.{d.year:04d}"
+    return birthday
 
 class Record:
+    __slots__ = ("name", "phones", "birthday", "_str")
+
     def __init__(self, name):
-        self.name = Name(name)
-        self.phones = []
+        # Names and phones are interned so repeated values share one string
+        self.name = Name(sys.intern(name))
+        # Phones keyed by number for constant-time lookups, in insertion order
+        self.phones = {}
         self.birthday = None
+        # Cached __str__ result, reset by every method that changes the record
+        self._str = None
 
     def add_phone(self, phone):
-        self.phones.append(Phone(phone))
+        phone = Phone(phone)
+        self.phones[phone.value] = phone
+        self._str = None
 
     def edit_phone(self, old_phone, new_phone):
-        for key, phone in enumerate(self.phones):
-            if phone.value == old_phone:
-                try:
-                    self.phones[key] = Phone(new_phone)
-                    return "Phone number updated."
-                except ValueError as e:
-                    return str(e)
-        return "Phone number not found."
+        if old_phone not in self.phones:
+            return "Phone number not found."
+        try:
+            phone = Phone(new_phone)
+        except ValueError as e:
+            return str(e)
+        # Rebuild the dict so the new number keeps the old one's position
+        phones = {}
+        for key, value in self.phones.items():
+            if key == old_phone:
+                key, value = phone.value, phone
+            phones[key] = value
+        self.phones = phones
+        self._str = None
+        return "Phone number updated."
 
     def find_phone(self, phone):
-        for p in self.phones:
-            if p.value == phone:
-                return p.value
+        if phone in self.phones:
+            return self.phones[phone].value
         return "Phone number not found."
 
     def add_birthday(self, birthday):
         self.birthday = Birthday(birthday)
+        self._str = None
 
     def __str__(self):
-        birthday_str = f", birthday: {self.birthday.value}" if self.birthday else ""
-        return f"Contact name: {self.name.value}, phones: {'; '.join(p.value for p in self.phones)}{birthday_str}"
+        if self._str is None:
+            birthday_str = f", birthday: {self.birthday.value}" if self.birthday else ""
+            self._str = f"Contact name: {self.name.value}, phones: {'; '.join(self.phones)}{birthday_str}"
+        return self._str
+
+    # Pickle a record as plain values instead of Field objects
+    def __getstate__(self):
+        birthday = self.birthday.date.toordinal() if self.birthday else None
+        return (self.name.value, list(self.phones), birthday)
+
+    # Restore from trusted pickled values without re-validating them
+    def __setstate__(self, state):
+        name, phones, birthday = state
+        self.name = object.__new__(Name)
+        self.name.value = sys.intern(name)
+        self.phones = {}
+        for value in phones:
+            phone = _phone_from_trusted(value)
+            self.phones[phone.value] = phone
+        self.birthday = _birthday_from_trusted(birthday) if birthday is not None else None
+        self._str = None
 
 class AddressBook(UserDict):
+    # Pickle as columns rather than one object per record
+    def __reduce__(self):
+        return (self.__class__.from_columns, self.to_columns())
+
+    # Parallel name / phones / birthday ordinal columns used as the on-disk format;
+    # birthday ordinals live in a packed int array, 0 meaning no birthday
+    def to_columns(self):
+        names = list(self.data)
+        phones = [list(record.phones) for record in self.data.values()]
+        birthdays = array("i", (record.birthday.date.toordinal() if record.birthday else 0
+                                for record in self.data.values()))
+        return names, phones, birthdays
+
+    @classmethod
+    def from_columns(cls, names, phones, birthdays):
+        book = cls()
+        for name, record_phones, birthday in zip(names, phones, birthdays):
+            record = Record.__new__(Record)
+            record.__setstate__((name, record_phones, birthday or None))
+            book.data[record.name.value] = record
+        return book
+
     def add_record(self, record):
-        self.data[record.name.value] = record
+        self.data[sys.intern(record.name.value)] = record
 
     def delete(self, name):
         if name in self.data:
@@ -86,31 +312,59 @@ class AddressBook(UserDict):
         return self.data.get(name)
 
     def get_upcoming_birthdays(self):
-        upcoming_birthdays = []
-        today = datetime.today().date()
-
-        for record in self.data.values():
-            if record.birthday:
-                birthday_date = record.birthday.date.date()
-                birthday_this_year = birthday_date.replace(year=today.year)
-
-                if birthday_this_year < today:
-                    birthday_this_year = birthday_date.replace(year=today.year + 1)
-
-                days_until_birthday = (birthday_this_year - today).days
-                if 0 <= days_until_birthday <= 7:
-                    congratulation_date = birthday_this_year
-                    if birthday_this_year.weekday() == 5:
-                        congratulation_date = birthday_this_year + timedelta(days=2)
-                    elif birthday_this_year.weekday() == 6:
-                        congratulation_date = birthday_this_year + timedelta(days=1)
-
-                    upcoming_birthdays.append({
-                        "name": record.name.value,
-                        "congratulation_date": congratulation_date.strftime("%d.%m.%Y")
-                    })
-
-        return upcoming_birthdays
+        window = _birthday_window(date.today())
+        return [
+            {"name": name, "congratulation_date": congratulation_date}
+            for name, record in self.data.items()
+            if record.birthday
+            and (congratulation_date := window.get((record.birthday.date.month, record.birthday.date.day)))
+        ]
+
+# AddressBook whose records are loaded on first access to data, so startup
+# does not wait for the snapshot to be unpickled
+class LazyAddressBook(AddressBook):
+    def __init__(self, loader):
+        self._loader = loader
+        self._data = None
+
+    @property
+    def data(self):
+        if self._loader is not None:
+            # Keep the loader until it succeeds so a failed load is not mistaken for an empty book
+            self._data = self._loader().data
+            self._loader = None
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._loader = None
+        self._data = value
+
+    # Copies and pickles are plain AddressBooks; UserDict.__copy__ reads data
+    # from the instance dict, which the property bypasses
+    def __copy__(self):
+        return AddressBook(self.data)
+
+    def __reduce__(self):
+        return (AddressBook.from_columns, self.to_columns())
+
+# Days to move a congratulation falling on Saturday (5) or Sunday (6) to Monday
+_WEEKEND_SHIFT = {5: 2, 6: 1}
+
+# Maps (month, day) of the next 7 days to the congratulation date,
+# so each record needs a single lookup instead of date arithmetic.
+# Cached, so the window is built once per day rather than per call
+@lru_cache(maxsize=1)
+def _birthday_window(today):
+    window = {}
+    today_ord = today.toordinal()
+    today_weekday = today.weekday()
+    for offset in range(8):
+        birthday_this_year = date.fromordinal(today_ord + offset)
+        shift = _WEEKEND_SHIFT.get((today_weekday + offset) % 7, 0)
+        congratulation_date = date.fromordinal(today_ord + offset + shift) if shift else birthday_this_year
+        window[(birthday_this_year.month, birthday_this_year.day)] = congratulation_date.strftime("%d.%m.%Y")
+    return window
 
 
 # Decorator to handle input errors
@@ -143,11 +397,12 @@ def input_error(func):
     return inner
 # Parses user input into command and arguments
 def parse_input(user_input):
-    cmd, *args = user_input.split() if user_input.strip() else (None, [])
-    if not cmd:
+    parts = user_input.split(maxsplit=1)
+    if not parts:
         return None, []
-    cmd = cmd.strip().lower()
-    return cmd, *args
+    cmd = parts[0].lower()
+    args = parts[1].split() if len(parts) > 1 else []
+    return cmd, args
 # Adds a new contact
 @input_error
 def add_contact(args, book: AddressBook):
@@ -178,18 +433,13 @@ def show_phone(args, book):
     name = args[0]
     record = book.find(name)
     if record:
-        return f"{name}: {'; '.join(p.value for p in record.phones)}"
+        return f"{name}: {'; '.join(record.phones)}"
     else:
         return "Contact not found."
 
 # Shows all contacts
 def show_all(book):
-    if not book.data:
-        return "No contacts found."
-    result = []
-    for record in book.data.values():
-        result.append(str(record))
-    return "\n".join(result)
+    return "\n".join(str(record) for record in book.data.values()) or "No contacts found."
 
 # Adds birthday to a contact
 @input_error
@@ -218,53 +468,84 @@ def show_birthday(args, book):
     else:
         return "Contact not found."
 
+# Output line for each upcoming birthday
+_CONGRATULATE = "Congratulate {name} on {congratulation_date}"
+
 # Shows upcoming birthdays
 @input_error
 def birthdays(args, book):
     upcoming = book.get_upcoming_birthdays()
     if upcoming:
-        result = []
-        for birthday_info in upcoming:
-            result.append(f"Congratulate {birthday_info['name']} on {birthday_info['congratulation_date']}")
-        return "\n".join(result)
+        return "\n".join(map(_CONGRATULATE.format_map, upcoming))
     else:
         return "No upcoming birthdays in the next week."
+
+# Commands that change the book and are replayed from the journal
+JOURNALED_COMMANDS = {
+    "add": add_contact,
+    "change": change_contact,
+    "add-birthday": add_birthday,
+}
+
+# Command name -> handler taking (args, book)
+COMMANDS = {
+    **JOURNALED_COMMANDS,
+    "phone": show_phone,
+    "show-birthday": show_birthday,
+    "birthdays": birthdays,
+}
+
+# Command name -> handler taking only the book
+NOARG_COMMANDS = {
+    "all": show_all,
+}
+
+# Snapshot of the contact a command refers to, used to detect whether it changed
+def _contact_state(args, book):
+    record = book.find(args[0]) if args else None
+    if record is None:
+        return None
+    return record.name.value, tuple(record.phones), record.birthday.value if record.birthday else None
+
 def main():
-    repo = AddressBookRepository()
-    book = repo.load()
+    repo = JournalRepository()
+    try:
+        book = repo.load()
+    except ValueError as e:
+        print(e)
+        return
     print("Welcome to the assistant bot!")
     while True:
         user_input = input("Enter a command: ")
-        command, *args = parse_input(user_input)
-
-        if command in ["close", "exit"]:
-            print("Good bye!")
-            repo.save(book)
-            break
+        command, args = parse_input(user_input)
+
+        if command in COMMANDS or command in NOARG_COMMANDS or command in ("close", "exit"):
+            # The snapshot is unpickled on first use, so a damaged one is reported here
+            try:
+                book.data
+            except ValueError as e:
+                print(e)
+                break
+
+        handler = COMMANDS.get(command)
+        if handler:
+            journaled = command in JOURNALED_COMMANDS
+            before = _contact_state(args, book) if journaled else None
+            print(handler(args, book))
+            # Journal only commands that actually changed the contact
+            if journaled and _contact_state(args, book) != before:
+                repo.append(command, args)
+
+        elif command in NOARG_COMMANDS:
+            print(NOARG_COMMANDS[command](book))
 
         elif command == "hello":
             print("How can I help you?")
 
-        elif command == "add":
-            print(add_contact(args, book))
-
-        elif command == "change":
-            print(change_contact(args, book))
-
-        elif command == "phone":
-            print(show_phone(args, book))
-
-        elif command == "all":
-            print(show_all(book))
-
-        elif command == "add-birthday":
-            print(add_birthday(args, book))
-
-        elif command == "show-birthday":
-            print(show_birthday(args, book))
-
-        elif command == "birthdays":
-            print(birthdays(args, book))
+        elif command in ("close", "exit"):
+            print("Good bye!")
+            repo.save(book)
+            break
 
         else:
             print("Invalid command.")